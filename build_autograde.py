@@ -3,9 +3,11 @@
 import os
 import re
 import sys
+import copy
 import enum
 import shutil
 import zipfile
+import subprocess
 import argparse
 import dataclasses
 import collections
@@ -19,6 +21,7 @@ import itertools
 import ipynb_metadata
 import ipynb_util
 import judge_setting
+import judge_util
 
 if (sys.version_info.major, sys.version_info.minor) < (3, 7):
     print('[ERROR] This script requires Python >= 3.7.')
@@ -41,6 +44,13 @@ REDIRECTION_CELL_FORMAT = """
 # Use {redirect_to} instead of this cell
 """.strip()
 
+BYTECODE_COMPILER = """
+import sys, py_compile, importlib.util
+for path in sys.argv[1:]:
+    print(py_compile.compile(path, importlib.util.cache_from_source(path), doraise=True,
+                             invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH))
+""".strip()
+
 class FieldKey(enum.Enum):
     WARNING = enum.auto()
     CONTENT = enum.auto()
@@ -51,6 +61,7 @@ class FieldKey(enum.Enum):
     SYSTEM_TEST_CASES = enum.auto()
     SYSTEM_TEST_CASES_EXECUTE_CELL = enum.auto()
     SYSTEM_TEST_SETTING = enum.auto()
+    SYSTEM_TEST_FIXTURES = enum.auto()
 
 class FieldProperty(enum.Flag):
     SINGLE = enum.auto()
@@ -69,6 +80,7 @@ FieldKey.STUDENT_TESTS.properties = FieldProperty.LIST | FieldProperty.OPTIONAL
 FieldKey.SYSTEM_TEST_CASES.properties = FieldProperty.LIST | FieldProperty.FILE
 FieldKey.SYSTEM_TEST_CASES_EXECUTE_CELL.properties = FieldProperty.SINGLE | FieldProperty.CODE
 FieldKey.SYSTEM_TEST_SETTING.properties = FieldProperty.SINGLE
+FieldKey.SYSTEM_TEST_FIXTURES.properties = FieldProperty.LIST | FieldProperty.OPTIONAL | FieldProperty.FILE | FieldProperty.CODE
 
 CellType = ipynb_util.NotebookCellType
 
@@ -98,6 +110,7 @@ class Exercise:
     student_tests: List[Cell]            # List of cells
     system_test_cases: List[Tuple[str,str,Cell]] # List of (filename, content, original code cell)
     system_test_setting: Callable        # judge_setting.generate created from Python code
+    system_test_fixtures: List[Tuple[str,str,Cell]] = dataclasses.field(default_factory=list) # List of (filename, generator code, original code cell)
 
     def submission_redirection(self):
         m = re.match(r'#[ \t]*redirect-to[ \t]*:[ \t]*(\S+?\.ipynb)', self.student_code_cell.source)
@@ -207,6 +220,7 @@ def load_exercise(dirpath, exercise_key):
         exercise_kwargs[field_key.lower()] = {
             FieldKey.SYSTEM_TEST_SETTING: lambda: load_system_test_setting(cells),
             FieldKey.SYSTEM_TEST_CASES: lambda: [split_file_code_cell(x) for x in cells],
+            FieldKey.SYSTEM_TEST_FIXTURES: lambda: [split_file_code_cell(x) for x in cells],
             FieldKey.STUDENT_CODE_CELL: lambda: cells[0],
         }.get(field_enum, lambda: cells)()
 
@@ -246,6 +260,40 @@ def cleanup_exercise_masters(exercises: Iterable[Exercise], commandline_options)
         metadata_new = ipynb_metadata.master_metadata(exercise.key, True, exercise.version, exercise.title, deadlines)
         ipynb_util.save_as_notebook(filepath, cells_new, metadata_new)
 
+def create_fixtures(exercises: Iterable[Exercise]):
+    exercises = list(exercises)
+    owners = {}
+    for exercise in exercises:
+        for name, _, _ in exercise.system_test_fixtures:
+            filepath = os.path.join(exercise.dirpath, name)
+            assert filepath not in owners, \
+                f'[ERROR] Fixture `{filepath}` is declared by both `{owners[filepath]}` and `{exercise.key}`; use a distinct name per exercise.'
+            owners[filepath] = exercise.key
+
+    for exercise in exercises:
+        for name, generator, _ in exercise.system_test_fixtures:
+            assert exercise.answer_examples, f'{exercise.key} has no answer example to generate `{name}`.'
+            answer = exercise.answer_examples[0].source
+            filepath = os.path.join(exercise.dirpath, name)
+            digest = hashlib.sha1('\0'.join([answer, generator]).encode()).hexdigest()
+            if judge_util.fixture_digest(filepath) == digest:
+                logging.debug(f'[TRACE] Fixture `{filepath}` is up to date')
+                continue
+            logging.info(f'[INFO] Generating fixture `{filepath}` ...')
+            answer_env, generator_env = {}, {}
+            exec(answer, answer_env)
+            exec(generator, generator_env)
+            assert 'FIXTURE_FUNCTION' in generator_env, f'{exercise.key}: `{name}` does not define FIXTURE_FUNCTION.'
+            assert 'fixture_inputs' in generator_env, f'{exercise.key}: `{name}` does not define fixture_inputs().'
+            assert generator_env['FIXTURE_FUNCTION'] in answer_env, \
+                f'{exercise.key}: the first answer example does not define `{generator_env["FIXTURE_FUNCTION"]}` for `{name}`.'
+            f = answer_env[generator_env['FIXTURE_FUNCTION']]
+            cases = []
+            for args in generator_env['fixture_inputs']():
+                args = tuple(args)
+                cases.append((copy.deepcopy(args), f(*args)))
+            judge_util.dump_fixture(filepath, cases, digest)
+
 def summarize_testcases(exercise: Exercise):
     contents = []
     is_not_decorator_line = lambda x: not x.startswith('@judge_util.')
@@ -255,7 +303,16 @@ def summarize_testcases(exercise: Exercise):
     contents.pop()
     return Cell(CellType.CODE, '\n'.join(contents))
 
-def create_exercise_configuration(exercise: Exercise):
+def add_bytecode(python, tests_dir, setting):
+    sources = sorted(x for x in judge_setting.required_files(setting) if x.endswith('.py'))
+    if not sources:
+        return
+    proc = subprocess.run([python, '-c', BYTECODE_COMPILER, *sources], cwd=tests_dir, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    bytecodes = dict(zip(sources, (x.replace(os.sep, '/') for x in proc.stdout.splitlines())))
+    for x in setting['judge']['evaluation_dag']['states'].values():
+        x['require_files'] = x['require_files'] + [bytecodes[f] for f in x['require_files'] if f in bytecodes]
+
+def create_exercise_configuration(exercise: Exercise, bytecode_python=None):
     tests_dir = os.path.join(CONF_DIR, exercise.key)
     os.makedirs(tests_dir, exist_ok=True)
 
@@ -263,8 +320,9 @@ def create_exercise_configuration(exercise: Exercise):
     _, metadata = ipynb_util.load_cells(os.path.join(exercise.dirpath, exercise.key + '.ipynb'), True)
     ipynb_util.save_as_notebook(os.path.join(CONF_DIR, exercise.key + '.ipynb'), cells, metadata)
     setting = exercise.generate_setting()
-    with open(os.path.join(tests_dir, 'setting.json'), 'w', encoding='utf-8') as f:
-        json.dump(setting, f, indent=1, ensure_ascii=False)
+    for name, _, _ in exercise.system_test_fixtures:
+        if name not in judge_setting.required_files(setting):
+            logging.warning(f'[WARNING] Fixture `{name}` of `{exercise.key}` is not in any require_files.')
     for name, content, _ in exercise.system_test_cases:
         with open(os.path.join(tests_dir, name), 'w', encoding='utf-8', newline='\n') as f:
             f.write(content)
@@ -274,11 +332,16 @@ def create_exercise_configuration(exercise: Exercise):
         os.makedirs(os.path.dirname(dest), exist_ok=True)
         shutil.copyfile(os.path.join(exercise.dirpath, path), dest)
 
-def create_configuration(exercises: Iterable[Exercise]):
+    if bytecode_python is not None:
+        add_bytecode(bytecode_python, tests_dir, setting)
+    with open(os.path.join(tests_dir, 'setting.json'), 'w', encoding='utf-8') as f:
+        json.dump(setting, f, indent=1, ensure_ascii=False)
+
+def create_configuration(exercises: Iterable[Exercise], bytecode_python=None):
     shutil.rmtree(CONF_DIR, ignore_errors=True)
     for exercise in exercises:
         logging.info(f'[INFO] Creating configuration for `{exercise.key}` ...')
-        create_exercise_configuration(exercise)
+        create_exercise_configuration(exercise, bytecode_python)
 
     logging.info(f'[INFO] Creating configuration zip `{CONF_DIR}.zip` ...')
     with zipfile.ZipFile(CONF_DIR + '.zip', 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -394,10 +457,13 @@ def main():
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose option')
     parser.add_argument('-d', '--deadline', metavar='DEADLINE_JSON', help='Specify a JSON file of deadline settings.')
     parser.add_argument('-c', '--configuration', metavar='JUDGE_ENV_JSON', help='Create configuration with environmental parameters specified in JSON.')
+    parser.add_argument('-b', '--bytecode', nargs='?', const=sys.executable, metavar='PYTHON', help='Include bytecode of Python files in require_files compiled by PYTHON of the judge environment version (default: this interpreter)')
     parser.add_argument('-n', '--renew_version', nargs='?', const=hashlib.sha1, metavar='VERSION', help='Renew the versions of every exercise (default: the SHA1 hash of each exercise definition)')
     parser.add_argument('-s', '--source', nargs='*', required=True, help=f'Specify source(s) (ipynb files in separate mode and directories in bundle mode)')
     parser.add_argument('-ff', '--filled_form', nargs='?', const='form_filled_all.ipynb', help='Generate an all-filled form (default: form_filled_all.ipynb)')
     commandline_options = parser.parse_args()
+    if commandline_options.bytecode and not commandline_options.configuration:
+        parser.error('-b/--bytecode requires -c/--configuration')
     if commandline_options.verbose:
         logging.getLogger().setLevel('DEBUG')
     else:
@@ -409,6 +475,9 @@ def main():
     logging.info('[INFO] Cleaning up exercise masters...')
     cleanup_exercise_masters(exercises, commandline_options)
 
+    logging.info('[INFO] Creating fixtures...')
+    create_fixtures(exercises)
+
     logging.info('[INFO] Creating bundled forms...')
     create_bundled_forms(bundles)
     logging.info('[INFO] Creating separate forms...')
@@ -417,7 +486,7 @@ def main():
     if commandline_options.configuration:
         Exercise.load_judge_parameters(commandline_options.configuration)
         logging.info(f'[INFO] Creating configuration with `{repr(Exercise.judge_parameters)}` ...')
-        create_configuration(exercises)
+        create_configuration(exercises, commandline_options.bytecode)
 
     if commandline_options.filled_form:
         logging.info(f'[INFO] Creating filled form `{commandline_options.filled_form}` ...')
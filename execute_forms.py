@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import dataclasses
+import subprocess
+import collections
+import concurrent.futures
+from typing import List, Optional, Tuple
+
+import json
+import logging
+
+import ipynb_util
+import judge_setting
+import build_autograde
+
+if (sys.version_info.major, sys.version_info.minor) < (3, 7):
+    print('[ERROR] This script requires Python >= 3.7.')
+    sys.exit(1)
+
+NOTEBOOK_PATTERNS = ('form_*.ipynb', 'ans_*.ipynb')
+
+RUNNER_SOURCE = """
+import sys, json, time, traceback
+cells = json.load(sys.stdin)
+namespace = {{'__name__': '__main__'}}
+results = []
+for index, source in cells:
+    begin = time.perf_counter()
+    try:
+        exec(compile(source, f'<cell {{index}}>', 'exec'), namespace)
+        error = None
+    except BaseException:
+        error = traceback.format_exc()
+    results.append((index, time.perf_counter() - begin, error))
+    with open({result_path!r}, 'w') as f:
+        json.dump(results, f)
+    if error is not None:
+        break # Stop at the first failing cell as "Run All" of Jupyter
+""".strip()
+
+@dataclasses.dataclass
+class NotebookResult:
+    path: str
+    cells: List[Tuple[int, float, Optional[str]]]  # List of (cell index, wall time, traceback) of executed cells
+    total: int                                     # Number of code cells
+    error: Optional[str]                           # None, 'timeout' or 'crash'
+    elapsed: float                                 # Wall time in seconds
+    stderr: str
+
+    def failures(self):
+        return [(i, e) for i, _, e in self.cells if e is not None]
+
+def filled_code_cells(notebook_path, exercises):
+    raw_cells, _ = ipynb_util.load_cells(notebook_path)
+    cells = []
+    for i, (cell_type, source) in enumerate(ipynb_util.normalized_cells(raw_cells)):
+        if cell_type != ipynb_util.NotebookCellType.CODE:
+            continue
+        m = re.search(r'<\[ (\S+) \]>', source)
+        if m and m[1] in exercises:
+            source = exercises[m[1]].submission_cell_filled().source
+        cells.append((i, source))
+    return cells
+
+def required_files(exercises: List[build_autograde.Exercise]):
+    files = collections.defaultdict(set) # Directory path -> paths relative to it
+    for ex in exercises:
+        setting = ex.system_test_setting('ENVIRONMENT', 2, 256, ex.key, ex.version, ex.student_code_cell.source) # Dummy parameters
+        files[os.path.normpath(ex.dirpath)].update(judge_setting.required_files(setting))
+    return files
+
+def prepare_workdir(dirpath, files, workdir):
+    os.makedirs(workdir)
+    if os.path.isdir(os.path.join(dirpath, '.judge')):
+        shutil.copytree(os.path.join(dirpath, '.judge'), os.path.join(workdir, '.judge'))
+    for path in files:
+        src, dest = os.path.join(dirpath, path), os.path.join(workdir, path)
+        if os.path.exists(src) and not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(src, dest)
+
+def execute_notebook(notebook_path, cells, files, timeout):
+    with tempfile.TemporaryDirectory(prefix='execute_forms-') as tmpdir:
+        workdir = os.path.join(tmpdir, 'work')
+        prepare_workdir(os.path.dirname(notebook_path) or '.', files, workdir)
+        result_path = os.path.join(tmpdir, 'result.json')
+        runner = RUNNER_SOURCE.format(result_path=result_path)
+        begin = time.perf_counter()
+        try:
+            proc = subprocess.run([sys.executable, '-c', runner], cwd=workdir,
+                                  input=json.dumps(cells).encode(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                  timeout=timeout)
+            error = None if proc.returncode == 0 else 'crash'
+            stderr = proc.stderr
+        except subprocess.TimeoutExpired as e:
+            error = 'timeout'
+            stderr = e.stderr or b''
+        elapsed = time.perf_counter() - begin
+        results = []
+        if os.path.exists(result_path):
+            with open(result_path, encoding='utf-8') as f:
+                results = [tuple(x) for x in json.load(f)]
+    return NotebookResult(notebook_path, results, len(cells), error, elapsed, stderr.decode(errors='replace'))
+
+def find_notebooks(exercises: List[build_autograde.Exercise]):
+    dirpaths = sorted({ex.dirpath for ex in exercises})
+    return [path for d in dirpaths for pattern in NOTEBOOK_PATTERNS for path in sorted(glob.glob(os.path.join(d, pattern)))]
+
+def report(r: NotebookResult):
+    status = r.error or ('failed' if r.failures() else 'ok')
+    logging.info(f'[INFO] {r.path}: {status}, {len(r.cells)}/{r.total} cell(s) in {r.elapsed:.3f}s')
+    for index, elapsed, _ in r.cells:
+        logging.debug(f'[DEBUG]   cell {index}: {elapsed:.3f}s')
+    for index, trace in r.failures():
+        logging.error(f'[ERROR] {r.path}: cell {index} failed\n{trace}')
+    if r.error is not None:
+        logging.error(f'[ERROR] {r.path}: {r.error} after {len(r.cells)} executed cell(s)\n{r.stderr}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose option (print per-cell timings)')
+    parser.add_argument('-s', '--source', nargs='*', required=True, help='Specify source(s) (ipynb files in separate mode and directories in bundle mode)')
+    parser.add_argument('-e', '--extra', nargs='*', default=[], metavar='IPYNB', help='Execute extra notebook(s) such as form_filled_all.ipynb')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='Number of notebooks executed in parallel (default: the number of CPUs)')
+    parser.add_argument('-t', '--timeout', type=float, default=60, help='Time limit of each notebook in seconds (default: 60)')
+    commandline_options = parser.parse_args()
+    if commandline_options.verbose:
+        logging.getLogger().setLevel('DEBUG')
+    else:
+        logging.getLogger().setLevel('INFO')
+
+    separates, bundles = build_autograde.load_sources(commandline_options.source)
+    exercises = [*separates, *(ex for exs in bundles.values() for ex in exs)]
+    key_to_exercise = {ex.key: ex for ex in exercises}
+    notebooks = find_notebooks(exercises) + commandline_options.extra
+    files = required_files(exercises)
+
+    begin = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=commandline_options.jobs) as executor:
+        futures = [executor.submit(execute_notebook, path, filled_code_cells(path, key_to_exercise),
+                                   files[os.path.normpath(os.path.dirname(path))], commandline_options.timeout)
+                   for path in notebooks]
+        results = [f.result() for f in futures]
+    for r in results:
+        report(r)
+    failed = [r.path for r in results if r.error or r.failures()]
+    logging.info(f'[INFO] Executed {len(results)} notebook(s) in {time.perf_counter() - begin:.3f}s, {len(failed)} failed')
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
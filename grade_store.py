@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+import itertools
+
+if (sys.version_info.major, sys.version_info.minor) < (3, 7):
+    print('[ERROR] This script requires Python >= 3.7.')
+    sys.exit(1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS grades (
+    student TEXT NOT NULL,
+    exercise_key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    graded_at REAL NOT NULL,
+    PRIMARY KEY (student, exercise_key, version)
+);
+CREATE TABLE IF NOT EXISTS states (
+    student TEXT NOT NULL,
+    exercise_key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    state TEXT NOT NULL,
+    status TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    elapsed REAL NOT NULL,
+    PRIMARY KEY (student, exercise_key, version, state)
+);
+CREATE TABLE IF NOT EXISTS tests (
+    student TEXT NOT NULL,
+    exercise_key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    state TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    tag TEXT,
+    PRIMARY KEY (student, exercise_key, version, state, name)
+);
+CREATE INDEX IF NOT EXISTS grades_exercise ON grades (exercise_key, version);
+CREATE INDEX IF NOT EXISTS grades_latest ON grades (student, exercise_key, graded_at);
+CREATE INDEX IF NOT EXISTS states_student ON states (student);
+CREATE INDEX IF NOT EXISTS states_exercise ON states (exercise_key, version, state, status);
+CREATE INDEX IF NOT EXISTS tests_student ON tests (student);
+CREATE INDEX IF NOT EXISTS tests_exercise ON tests (exercise_key, version, state);
+CREATE INDEX IF NOT EXISTS tests_tag ON tests (tag, exercise_key);
+"""
+
+# The latest version graded for each pair of student and exercise, unless a version is specified
+SELECTED_GRADES = """
+WITH selected AS (
+    SELECT student, exercise_key, version, score FROM grades AS g
+    WHERE (:version IS NULL AND graded_at = (SELECT MAX(graded_at) FROM grades AS h
+                                             WHERE h.student = g.student AND h.exercise_key = g.exercise_key))
+       OR version = :version
+)
+"""
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def store_grade(conn, student, version, grade):
+    key = (student, grade.exercise_key, version)
+    with conn:
+        conn.execute('DELETE FROM states WHERE student = ? AND exercise_key = ? AND version = ?', key)
+        conn.execute('DELETE FROM tests WHERE student = ? AND exercise_key = ? AND version = ?', key)
+        conn.execute('INSERT OR REPLACE INTO grades VALUES (?, ?, ?, ?, ?, ?)',
+                     (*key, grade.verdict, grade.score(), time.time()))
+        for r in grade.states:
+            conn.execute('INSERT INTO states VALUES (?, ?, ?, ?, ?, ?, ?)', (*key, r.state, r.status(), r.score(), r.elapsed))
+            for method_name, status in r.tests.items():
+                conn.execute('INSERT INTO tests VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (*key, r.state, method_name, status, r.test_score(method_name), r.test_tag(method_name)))
+
+def write_matrix(rows, columns, writer):
+    writer.writerow(['student', *columns])
+    for student, cells in itertools.groupby(rows, key=lambda x: x[0]):
+        values = {column: value for _, column, value in cells}
+        writer.writerow([student, *(values.get(c, '') for c in columns)])
+
+def score_matrix(conn, writer, exercise_key=None, version=None):
+    params = {'exercise_key': exercise_key, 'version': version}
+    if exercise_key is None:
+        query = SELECTED_GRADES + 'SELECT student, exercise_key, score FROM selected ORDER BY student'
+        columns = [k for k, in conn.execute('SELECT DISTINCT exercise_key FROM grades ORDER BY exercise_key')]
+    else:
+        query = SELECTED_GRADES + """
+        SELECT s.student, s.state, s.score FROM states AS s
+        JOIN selected USING (student, exercise_key, version)
+        WHERE s.exercise_key = :exercise_key ORDER BY s.student
+        """
+        columns = [k for k, in conn.execute('SELECT state FROM states WHERE exercise_key = ? GROUP BY state ORDER BY MIN(rowid)', (exercise_key,))]
+    write_matrix(conn.execute(query, params), columns, writer)
+
+def tag_histogram(conn, writer, exercise_key=None, version=None):
+    query = SELECTED_GRADES + """
+    SELECT t.exercise_key, t.tag, COUNT(DISTINCT t.student) FROM tests AS t
+    JOIN selected USING (student, exercise_key, version)
+    WHERE t.tag IS NOT NULL AND (:exercise_key IS NULL OR t.exercise_key = :exercise_key)
+    GROUP BY t.exercise_key, t.tag ORDER BY t.exercise_key, t.tag
+    """
+    writer.writerow(['exercise_key', 'tag', 'students'])
+    writer.writerows(conn.execute(query, {'exercise_key': exercise_key, 'version': version}))
+
+def find_students(conn, writer, exercise_key=None, version=None, state=None, status=None, tag=None):
+    query = SELECTED_GRADES + """
+    SELECT DISTINCT s.student, s.exercise_key, s.version FROM states AS s
+    JOIN selected USING (student, exercise_key, version)
+    WHERE (:exercise_key IS NULL OR s.exercise_key = :exercise_key)
+      AND (:state IS NULL OR s.state = :state)
+      AND (:status IS NULL OR s.status = :status)
+      AND (:tag IS NULL OR EXISTS (SELECT 1 FROM tests AS t
+                                   WHERE t.student = s.student AND t.exercise_key = s.exercise_key
+                                     AND t.version = s.version AND t.state = s.state AND t.tag = :tag))
+    ORDER BY s.student, s.exercise_key
+    """
+    params = {'exercise_key': exercise_key, 'version': version, 'state': state, 'status': status, 'tag': tag}
+    writer.writerow(['student', 'exercise_key', 'version'])
+    writer.writerows(conn.execute(query, params))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('database', help='SQLite database of grading results')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    scores = subparsers.add_parser('scores', help='Print a score matrix of students and exercises (or states of an exercise with -e)')
+    tags = subparsers.add_parser('tags', help='Print a histogram of tags')
+    students = subparsers.add_parser('students', help='Print students matching conditions')
+    for p in (scores, tags, students):
+        p.add_argument('-e', '--exercise', metavar='EXERCISE_KEY', help='Specify an exercise')
+        p.add_argument('-V', '--version', help='Specify a version of exercises (default: the latest graded one)')
+    students.add_argument('--state', help='Specify a state such as `hidden`')
+    students.add_argument('--status', choices=('pass', 'fail', 'timeout', 'crash'), help='Specify a status of the state')
+    students.add_argument('--tag', help='Specify a tag given in the state')
+    commandline_options = parser.parse_args()
+
+    conn = connect(commandline_options.database)
+    writer = csv.writer(sys.stdout)
+    if commandline_options.command == 'scores':
+        score_matrix(conn, writer, commandline_options.exercise, commandline_options.version)
+    elif commandline_options.command == 'tags':
+        tag_histogram(conn, writer, commandline_options.exercise, commandline_options.version)
+    else:
+        find_students(conn, writer, commandline_options.exercise, commandline_options.version,
+                      commandline_options.state, commandline_options.status, commandline_options.tag)
+
+if __name__ == '__main__':
+    main()
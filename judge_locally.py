@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import dataclasses
+import subprocess
+import concurrent.futures
+from typing import List, Dict, Optional
+
+import json
+import logging
+
+import ipynb_util
+import judge_util
+import build_autograde
+import grade_store
+
+if (sys.version_info.major, sys.version_info.minor) < (3, 7):
+    print('[ERROR] This script requires Python >= 3.7.')
+    sys.exit(1)
+
+DEFAULT_JUDGE_PARAMETERS = {'environment': 'ENVIRONMENT', 'time_limit': 2, 'memory_limit': 256}
+
+ACCEPT_STATE = 'accept'
+
+RESULT_FILE = 'result.json'
+
+CANCEL_POLLING_INTERVAL = 0.05
+
+RUNNER_SOURCE = """
+import sys, json, unittest, importlib.util
+class Result(unittest.TestResult):
+    statuses = {{}}
+    setup_failed = False
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.statuses[test._testMethodName] = 'pass'
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.statuses[test._testMethodName] = 'fail'
+    def addError(self, test, err):
+        super().addError(test, err)
+        if hasattr(test, '_testMethodName'):
+            self.statuses[test._testMethodName] = 'error'
+        else: # Raised by setUpClass, setUpModule and so on
+            self.setup_failed = True
+sys.path.insert(0, '')
+spec = importlib.util.spec_from_file_location('submission', {submission!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+result = Result()
+unittest.defaultTestLoader.loadTestsFromModule(module).run(result)
+for test, trace in result.failures + result.errors:
+    print(trace, file=sys.stderr)
+with open({result_path!r}, 'w') as f:
+    json.dump({{'tests': result.statuses, 'setup_failed': result.setup_failed}}, f)
+""".strip()
+
+@dataclasses.dataclass
+class StateResult:
+    state: str
+    tests: Dict[str, str]   # Test method name -> 'pass', 'fail' or 'error' (tagged on neither)
+    setup_failed: bool      # An error raised outside test methods
+    error: Optional[str]    # None, 'timeout', 'crash' or 'cancelled'
+    elapsed: float          # Wall time in seconds
+    stderr: str
+
+    def test_status(self, method_name):
+        _, ok_score, fail_score, _, _ = judge_util.parse_test_method_name(method_name)
+        status = self.tests[method_name]
+        # A failure keeping the full score (i.e., tagging) does not block transitions
+        return 'pass' if fail_score == ok_score else status
+
+    def completed(self):
+        return self.error is None and not self.setup_failed and len(self.tests) > 0
+
+    def status(self):
+        if self.error is not None:
+            return self.error
+        return 'pass' if self.completed() and all(self.test_status(x) == 'pass' for x in self.tests) else 'fail'
+
+    def test_score(self, method_name):
+        _, ok_score, fail_score, _, _ = judge_util.parse_test_method_name(method_name)
+        return ok_score if self.tests[method_name] == 'pass' else fail_score
+
+    def test_tag(self, method_name):
+        _, _, _, ok_tag, fail_tag = judge_util.parse_test_method_name(method_name)
+        return {'pass': ok_tag, 'fail': fail_tag}.get(self.tests[method_name])
+
+    def score(self):
+        return sum(self.test_score(x) for x in self.tests)
+
+    def tags(self):
+        return {self.test_tag(x) for x in self.tests} - {None}
+
+@dataclasses.dataclass
+class Grade:
+    exercise_key: str
+    submission: str                  # Label of the graded source
+    verdict: str                     # 'accept' or 'reject'
+    states: List[StateResult]        # Results of states evaluated by the transitions
+    discarded: List[str]             # States speculatively started but thrown away
+    elapsed: float                   # Wall time in seconds
+
+    def score(self):
+        return sum(r.score() for r in self.states)
+
+    def tags(self):
+        return sorted(set().union(*(r.tags() for r in self.states)))
+
+def run_state(exercise: build_autograde.Exercise, setting, state, source, cancelled=None):
+    state_setting = setting['judge']['evaluation_dag']['states'][state]
+    test_sources = {name: content for name, content, _ in exercise.system_test_cases}
+    submission = setting['judge']['preprocess']['rename']
+    with tempfile.TemporaryDirectory(prefix=f'{exercise.key}-{state}-') as workdir:
+        for path in state_setting['require_files']:
+            dest = os.path.join(workdir, path)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(os.path.join(exercise.dirpath, path), dest)
+        with open(os.path.join(workdir, submission), 'w', encoding='utf-8', newline='\n') as f:
+            f.write(source.rstrip() + '\n\n' + test_sources[f'{state}.py']) # evaluation_style: append
+        result_path = os.path.join(workdir, RESULT_FILE)
+        runner = RUNNER_SOURCE.format(submission=submission, result_path=result_path)
+        begin = time.perf_counter()
+        with subprocess.Popen([sys.executable, '-c', runner], cwd=workdir, stdin=subprocess.DEVNULL,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as proc:
+            while True:
+                try:
+                    _, stderr = proc.communicate(timeout=CANCEL_POLLING_INTERVAL)
+                    error = None if proc.returncode == 0 and os.path.exists(result_path) else 'crash'
+                    break
+                except subprocess.TimeoutExpired:
+                    if time.perf_counter() - begin >= state_setting['time_limit']:
+                        error = 'timeout'
+                    elif cancelled is not None and cancelled.is_set():
+                        error = 'cancelled'
+                    else:
+                        continue
+                    proc.kill()
+                    _, stderr = proc.communicate()
+                    break
+        stderr = stderr.decode(errors='replace')
+        elapsed = time.perf_counter() - begin
+        outcome = {'tests': {}, 'setup_failed': False}
+        if error is None:
+            with open(result_path, encoding='utf-8') as f:
+                outcome = json.load(f)
+    return StateResult(state, outcome['tests'], outcome['setup_failed'], error, elapsed, stderr)
+
+def next_state(state_setting, result: StateResult):
+    if not result.completed():
+        return None
+    statuses = [result.test_status(x) for x in result.tests]
+    for (quantifier, accepted), target in state_setting['transitions']:
+        assert quantifier == '$forall', f'Unsupported transition condition: {quantifier}'
+        if all(s in accepted for s in statuses):
+            return target
+    return None
+
+def optimistic_path(dag):
+    path = []
+    state = dag['initial_state']
+    while state in dag['states'] and state not in path:
+        path.append(state)
+        transitions = dag['states'][state]['transitions']
+        state = transitions[0][1] if transitions else None
+    return path
+
+def grade(exercise: build_autograde.Exercise, source, label, executor=None):
+    setting = exercise.generate_setting()
+    dag = setting['judge']['evaluation_dag']
+    begin = time.perf_counter()
+    futures = {}
+    cancelled = threading.Event()
+    if executor is not None:
+        futures = {s: executor.submit(run_state, exercise, setting, s, source, cancelled) for s in optimistic_path(dag)}
+
+    results = []
+    discarded = []
+    state = dag['initial_state']
+    while state in dag['states']:
+        if state in futures:
+            result = futures.pop(state).result()
+            if result.error == 'timeout':
+                # The time limit is in wall time, so a state competing with speculative ones may time out spuriously.
+                # Stop the speculation and re-run the state alone as in the sequential transitions.
+                discard_speculation(futures, cancelled, discarded)
+                result = run_state(exercise, setting, state, source)
+        else:
+            result = run_state(exercise, setting, state, source)
+        results.append(result)
+        state = next_state(dag['states'][state], result)
+
+    discard_speculation(futures, cancelled, discarded)
+    elapsed = time.perf_counter() - begin
+    verdict = 'accept' if state == ACCEPT_STATE else 'reject'
+    return Grade(exercise.key, label, verdict, results, discarded, elapsed)
+
+def discard_speculation(futures, cancelled, discarded):
+    cancelled.set()
+    for future in futures.values():
+        future.cancel()
+    concurrent.futures.wait(futures.values())
+    discarded.extend(futures)
+    futures.clear()
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS and Windows
+        return os.cpu_count() or 1
+
+def load_submissions(notebook_paths):
+    submissions = []
+    for path in notebook_paths:
+        raw_cells, _ = ipynb_util.load_cells(path)
+        for cell_type, source in ipynb_util.normalized_cells(raw_cells):
+            m = re.search(r'<\[ (\S+) \]>', source)
+            if cell_type == ipynb_util.NotebookCellType.CODE and m:
+                submissions.append((m[1], path, source))
+    return submissions
+
+def report(g: Grade):
+    logging.info(f'[INFO] {g.exercise_key} ({g.submission}): {g.verdict}, score {g.score()}, tags {g.tags()}')
+    for r in g.states:
+        logging.info(f'[INFO]   {r.state}: {r.status()} in {r.elapsed:.3f}s')
+        logging.debug(r.stderr)
+    if g.discarded:
+        logging.info(f'[INFO]   discarded: {", ".join(g.discarded)}')
+    sequential = sum(r.elapsed for r in g.states)
+    logging.info(f'[INFO]   wall time {g.elapsed:.3f}s (sum of states: {sequential:.3f}s)')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose option')
+    parser.add_argument('-c', '--configuration', metavar='JUDGE_ENV_JSON', help='Use environmental parameters specified in JSON.')
+    parser.add_argument('-s', '--source', nargs='*', required=True, help='Specify source(s) (ipynb files in separate mode and directories in bundle mode)')
+    parser.add_argument('-a', '--answers', nargs='*', metavar='FORM_IPYNB', help='Grade answer cells in filled form(s) (default: every answer example of the sources)')
+    parser.add_argument('-o', '--store', metavar='SQLITE_DB', help='Store results into an SQLite database incrementally')
+    parser.add_argument('-p', '--speculative', nargs='?', type=int, const=available_cpus(), metavar='JOBS', help='Run later states speculatively in parallel (default and maximum: the number of available CPUs)')
+    commandline_options = parser.parse_args()
+    if commandline_options.verbose:
+        logging.getLogger().setLevel('DEBUG')
+    else:
+        logging.getLogger().setLevel('INFO')
+
+    separates, bundles = build_autograde.load_sources(commandline_options.source)
+    exercises = {ex.key: ex for ex in [*separates, *(ex for exs in bundles.values() for ex in exs)]}
+    if commandline_options.configuration:
+        build_autograde.Exercise.load_judge_parameters(commandline_options.configuration)
+    else:
+        build_autograde.Exercise.judge_parameters = {'default': DEFAULT_JUDGE_PARAMETERS, 'override': {}}
+
+    if commandline_options.answers is None:
+        submissions = [(ex.key, f'answer_examples[{i}]', x.source) for ex in exercises.values() for i, x in enumerate(ex.answer_examples)]
+    else:
+        submissions = [x for x in load_submissions(commandline_options.answers) if x[0] in exercises]
+
+    executor = None
+    if commandline_options.speculative:
+        if commandline_options.speculative > available_cpus():
+            logging.warning(f'[WARNING] Limit speculative jobs to {available_cpus()} available CPU(s).')
+            commandline_options.speculative = available_cpus()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=commandline_options.speculative)
+    conn = grade_store.connect(commandline_options.store) if commandline_options.store else None
+    begin = time.perf_counter()
+    grades = []
+    for key, label, source in submissions:
+        g = grade(exercises[key], source, label, executor)
+        report(g)
+        if conn is not None:
+            grade_store.store_grade(conn, label, exercises[key].version, g)
+        grades.append(g)
+    if executor is not None:
+        executor.shutdown()
+    sequential = sum(r.elapsed for g in grades for r in g.states)
+    logging.info(f'[INFO] Graded {len(grades)} submission(s) in {time.perf_counter() - begin:.3f}s (sum of states: {sequential:.3f}s)')
+
+if __name__ == '__main__':
+    main()
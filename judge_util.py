@@ -1,17 +1,17 @@
 #!/usr/bin/env python3
 
-import ast, inspect
-import unittest
-import sys, io
+import sys, io, os
 
 
 def _func_source(f):
+    import inspect
     src_lines = inspect.getsource(f).splitlines()
     offset_indent = len(src_lines[0]) - len(src_lines[0].lstrip(' '))
     return '\n'.join(x[offset_indent:] for x in src_lines)
 
 
 def is_ellipsis_body(f):
+    import ast
     node = next(n for n in ast.walk(ast.parse(_func_source(f))) if type(n) == ast.FunctionDef and n.name == f.__name__)
     def is_ellipsis(s):
         if type(s) == ast.Expr:
@@ -24,6 +24,7 @@ def is_ellipsis_body(f):
 
 
 def find_loop(f):
+    import ast
     for n in  ast.walk(ast.parse(_func_source(f))):
         if type(n) == ast.For:
             return n
@@ -32,6 +33,7 @@ def find_loop(f):
 
 
 def congruent(f, g):
+    import ast
     alias_map = {f.__name__: g.__name__, g.__name__: f.__name__}
     def eq(x, y):
         if type(x) != type(y):
@@ -45,6 +47,7 @@ def congruent(f, g):
 
 
 def testcase(score=1):
+    import unittest
     class JudgeTestCase(unittest.TestCase):
         pass
     JudgeTestCase.score = score
@@ -55,6 +58,13 @@ def _test_method_name(name, ok_score, fail_score, ok_tag=None, fail_tag=None):
     return f'test_{ok_tag}_{ok_score}_{fail_tag}_{fail_score}_{name}'
 
 
+def parse_test_method_name(method_name):
+    assert method_name.startswith('test_'), f'Not a test method: {method_name}'
+    ok_tag, ok_score, fail_tag, fail_score, name = method_name[len('test_'):].split('_', 4)
+    none_if_absent = lambda tag: None if tag == 'None' else tag
+    return name, int(ok_score), int(fail_score), none_if_absent(ok_tag), none_if_absent(fail_tag)
+
+
 def check_method(testcase_cls, fail_tag=None):
     assert isinstance(testcase_cls.score,int) and testcase_cls.score > 0
     def decorator(func):
@@ -84,20 +94,23 @@ def tagging_method(testcase_cls, ok_tag):
 
 _argument_log = io.StringIO()
 
+def _cutoff(s, limit=256):
+    return s[:limit] + '...' if len(s) >= limit else s
+
 def argument_logger(f):
-    def argrepr(x):
-        if isinstance(x, io.TextIOBase):
+    def argrepr(x, limit=256):
+        if isinstance(x, (io.TextIOBase, io.BufferedIOBase)):
             pos = x.tell()
-            s = x.read()
+            s = x.read(limit)
             x.seek(pos)
             return f'File({repr(s)})'
+        elif isinstance(x, memoryview):
+            return f'memoryview({repr(x[:limit].tolist())})'
         else:
             return repr(x)
-    def cutoff(s, limit=256):
-        return s[:limit] + '...' if len(s) >= limit else s
     def wrapper(*args, **kwargs):
-        args_repr = [cutoff(argrepr(x)) for x in args]
-        args_repr.extend(f'{k}={cutoff(argrepr(v))}' for k, v in kwargs.items())
+        args_repr = [_cutoff(argrepr(x)) for x in args]
+        args_repr.extend(f'{k}={_cutoff(argrepr(v))}' for k, v in kwargs.items())
         logfile = _argument_log if 'IPython' in sys.modules else sys.stderr
         print(f'Called: {f.__name__}({", ".join(args_repr)})', file=logfile)
         return f(*args, **kwargs)
@@ -108,3 +121,95 @@ def read_argument_log():
     log = _argument_log.getvalue()
     _argument_log = io.StringIO()
     return log
+
+
+_FIXTURE_MAGIC = b'#fixture:'
+
+def dump_fixture(path, cases, digest=''):
+    import pickle, zlib
+    with open(path, 'wb') as f:
+        f.write(_FIXTURE_MAGIC + digest.encode() + b'\n')
+        f.write(zlib.compress(pickle.dumps(list(cases), protocol=4), 9))
+
+def fixture_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return None
+    return header[len(_FIXTURE_MAGIC):].strip().decode() if header.startswith(_FIXTURE_MAGIC) else None
+
+_loaded_fixtures = {}
+
+def load_fixture(path):
+    import pickle, zlib
+    path = os.path.abspath(path)
+    if path not in _loaded_fixtures:
+        with open(path, 'rb') as f:
+            assert f.readline().startswith(_FIXTURE_MAGIC), f'Not a fixture: {path}'
+            _loaded_fixtures[path] = pickle.loads(zlib.decompress(f.read()))
+    return _loaded_fixtures[path] # Shared in the process; never mutate it
+
+def check_with_fixture(test, f, path):
+    import copy
+    for args, expected in load_fixture(path):
+        actual = f(*copy.deepcopy(args)) # Keep the cached arguments intact
+        if actual != expected:
+            args_repr = _cutoff(', '.join(repr(x) for x in args))
+            test.assertEqual(actual, expected, f'Called: {f.__name__}({args_repr})')
+
+
+_mapped_files = {}
+
+def mapped_file(path):
+    import mmap
+    path = os.path.abspath(path)
+    if path not in _mapped_files:
+        with open(path, 'rb') as f:
+            empty = os.fstat(f.fileno()).st_size == 0
+            _mapped_files[path] = memoryview(b'' if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return _mapped_files[path]
+
+def mapped_array(path, typecode):
+    return mapped_file(path).cast(typecode)
+
+
+class _MappedRawIO(io.RawIOBase):
+    def __init__(self, path):
+        self.name = path
+        self._view = mapped_file(path)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos+n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def open_mapped(path, mode='r', encoding='utf-8'):
+    assert mode in ('r', 'rb'), f'Unsupported mode: {mode}'
+    f = io.BufferedReader(_MappedRawIO(path))
+    return f if mode == 'rb' else io.TextIOWrapper(f, encoding=encoding)
+
+def lazy_fixture(f):
+    cache = {}
+    def wrapper(*args):
+        if args not in cache:
+            cache[args] = f(*args)
+        return cache[args]
+    return wrapper